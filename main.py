@@ -3,7 +3,9 @@ BG Trackers Unified Search - Stremio Addon
 Main application entry point
 """
 import logging
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, Request
+from pydantic import BaseModel
 from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
@@ -89,6 +91,7 @@ async def root():
             
             <h2>Configuration</h2>
             <p>After installation, configure your tracker credentials and debrid services in the addon settings.</p>
+            <p><a href="/configure" style="color: #eee;">⚙️ Configure your own debrid keys</a></p>
             
             <h2>Status</h2>
             <p>🟢 Addon is running</p>
@@ -100,31 +103,121 @@ async def root():
     return HTMLResponse(content=html)
 
 
+from services.jackett import jackett_service
+from services.metadata import metadata_service
+from services.executor import worker_pool, loop_monitor
+from services.tenants import tenant_registry, encode_config, secret_key_configured
+from services.search import search, check_debrid, extract_hashes
+from services.prefetch import popularity, prefetcher
+
+
+def invalid_config_response() -> JSONResponse:
+    return JSONResponse(status_code=400, content={"error": "Invalid configuration"})
+
+
+class TenantConfig(BaseModel):
+    """Per-user settings submitted from the configure page"""
+    realdebrid_api_key: Optional[str] = None
+    torbox_api_key: Optional[str] = None
+
+
+@app.get("/configure")
+@app.get("/{config}/configure")
+async def configure_page(config: Optional[str] = None):
+    """Configuration page: encrypts the user's keys into a personal install URL"""
+    html = f"""
+    <html>
+        <head><title>{settings.addon_name} - Configure</title></head>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 50px auto; background: #1a1a2e; color: #eee;">
+            <h1>Configure {settings.addon_name}</h1>
+            <form id="config">
+                <p><label>RealDebrid API key<br><input name="realdebrid_api_key" size="50"></label></p>
+                <p><label>TorBox API key<br><input name="torbox_api_key" size="50"></label></p>
+                <button type="submit">Generate install link</button>
+            </form>
+            <p><a id="install" style="color: #eee;"></a></p>
+            <script>
+                document.getElementById("config").onsubmit = async (e) => {{
+                    e.preventDefault();
+                    const body = Object.fromEntries(new FormData(e.target));
+                    const resp = await fetch("/configure", {{
+                        method: "POST",
+                        headers: {{"Content-Type": "application/json"}},
+                        body: JSON.stringify(body)
+                    }});
+                    const data = await resp.json();
+                    const link = document.getElementById("install");
+                    if (!resp.ok) {{
+                        link.removeAttribute("href");
+                        link.textContent = data.error;
+                        return;
+                    }}
+                    link.href = data.install_url;
+                    link.textContent = "📦 Install in Stremio";
+                }};
+            </script>
+        </body>
+    </html>
+    """
+    return HTMLResponse(content=html)
+
+
+@app.post("/configure")
+async def configure(config: TenantConfig, request: Request):
+    """Encrypt a tenant config and return its personal manifest URL"""
+    if not secret_key_configured():
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Per-user configuration is disabled until SECRET_KEY is set on the server"}
+        )
+    token = encode_config(config.model_dump())
+    manifest_url = str(request.url_for("tenant_manifest", config=token))
+    return {
+        "manifest_url": manifest_url,
+        "install_url": "stremio://" + manifest_url.split("://", 1)[-1]
+    }
+
+
 @app.get("/manifest.json")
 async def manifest():
     """Return Stremio manifest"""
     return JSONResponse(content=get_manifest())
 
 
+@app.get("/{config}/manifest.json", name="tenant_manifest")
+async def tenant_manifest(config: str):
+    """Return Stremio manifest for a configured install"""
+    if tenant_registry.get(config) is None:
+        return invalid_config_response()
+    return JSONResponse(content=get_manifest())
+
+
 @app.get("/catalog/{type}/{id}.json")
-async def catalog(type: str, id: str):
+@app.get("/{config}/catalog/{type}/{id}.json")
+async def catalog(type: str, id: str, config: Optional[str] = None):
     """Return catalog metas (placeholder)"""
     logger.info(f"Catalog request: type={type}, id={id}")
     return JSONResponse(content={"metas": []})
 
 
-from services.jackett import jackett_service
-from services.realdebrid import rd_service
-from services.torbox import torbox_service
-from services.metadata import metadata_service
-import asyncio
+@app.on_event("startup")
+async def startup_event():
+    if not secret_key_configured():
+        logger.error(
+            "SECRET_KEY is the public placeholder, /configure will not issue "
+            "install URLs until a random secret is set"
+        )
+    loop_monitor.start()
+    prefetcher.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await loop_monitor.close()
+    await prefetcher.close()
     await jackett_service.close()
-    await rd_service.close()
-    await torbox_service.close()
+    await tenant_registry.close()
     await metadata_service.close()
+    await worker_pool.close()
 
 def format_size(size_bytes: int) -> str:
     """Format bytes to human readable string"""
@@ -137,59 +230,20 @@ def format_size(size_bytes: int) -> str:
     return f"{size_bytes:.2f}PB"
 
 @app.get("/stream/{type}/{id}.json")
-async def stream(type: str, id: str):
+@app.get("/{config}/stream/{type}/{id}.json")
+async def stream(type: str, id: str, config: Optional[str] = None):
     """Return streams for given content"""
     logger.info(f"Stream request: type={type}, id={id}")
     
-    search_query = id
-    
-    # Resolve IMDb ID to Title if possible
-    if id.startswith("tt"):
-        title, year = await metadata_service.get_details(type, id)
-        if title:
-            # Construct text query: "Title Year"
-            # This is much better for trackers like ArenaBG/Zelka
-            search_query = f"{title} {year}" if year else title
-            logger.info(f"Resolved {id} to query: '{search_query}'")
+    tenant = tenant_registry.get(config)
+    if tenant is None:
+        return invalid_config_response()
     
-    # Search Jackett
-    results = await jackett_service.search(type, search_query)
-    
-    # Extract hashes for Debrid checks
-    hashes = []
-    for res in results:
-        if res.get("info_hash"):
-            hashes.append(res["info_hash"])
-        elif res.get("magnet"):
-            import re
-            match = re.search(r'xt=urn:btih:([a-zA-Z0-9]+)', res["magnet"])
-            if match:
-                res["info_hash"] = match.group(1) # Store for later
-                hashes.append(match.group(1))
-
-    # Check Debrid availability in parallel
-    rd_cache = {}
-    torbox_cache = {}
-    
-    tasks = []
-    if settings.realdebrid_api_key and hashes:
-        tasks.append(rd_service.check_availability(hashes))
-    else:
-        tasks.append(asyncio.sleep(0)) # Dummy task
-        
-    if settings.torbox_api_key and hashes:
-        tasks.append(torbox_service.check_availability(hashes))
-    else:
-        tasks.append(asyncio.sleep(0)) # Dummy task
-        
-    # Execute checks
-    check_results = await asyncio.gather(*tasks)
-    
-    if settings.realdebrid_api_key and hashes:
-        rd_cache = check_results[0] if isinstance(check_results[0], dict) else {}
-        
-    if settings.torbox_api_key and hashes:
-        torbox_cache = check_results[1] if isinstance(check_results[1], dict) else {}
+    results = await search(type, id)
+    # Only titles that actually have results are worth keeping warm
+    if results:
+        popularity.record(type, id)
+    rd_cache, torbox_cache = await check_debrid(tenant, extract_hashes(results))
 
     streams = []
     for res in results:
@@ -200,12 +254,12 @@ async def stream(type: str, id: str):
         if info_hash:
             if rd_cache.get(info_hash):
                 prefixes.append("[RD+]")
-            elif settings.realdebrid_api_key:
+            elif tenant.realdebrid_api_key:
                 prefixes.append("[RD]")
                 
             if torbox_cache.get(info_hash):
                 prefixes.append("[TB+]")
-            elif settings.torbox_api_key:
+            elif tenant.torbox_api_key:
                 prefixes.append("[TB]")
         
         if not prefixes:
@@ -242,7 +296,11 @@ async def stream(type: str, id: str):
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    return {"status": "healthy", "version": settings.addon_version}
+    return {
+        "status": "healthy",
+        "version": settings.addon_version,
+        "loop_lag": loop_monitor.stats()
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class TTLCache:
+    """
+    In-memory cache with a per-entry TTL and a bounded size (LRU eviction).
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def expires_in(self, key: Hashable) -> Optional[float]:
+        """Seconds until the entry expires, None if missing or already expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        remaining = entry[0] - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+async def cached_lookup(
+    cache: TTLCache,
+    keys: List[Hashable],
+    fetch: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+    refresh: bool = False
+) -> Dict[Hashable, Any]:
+    """
+    Resolve keys from cache, fetching only the missing ones (all of them if
+    refresh is set) and storing what fetch returns.
+    """
+    found = {}
+    missing = []
+    for key in keys:
+        cached = None if refresh else cache.get(key)
+        if cached is None:
+            missing.append(key)
+        else:
+            found[key] = cached
+
+    if missing:
+        fetched = await fetch(missing)
+        for key, value in fetched.items():
+            cache.set(key, value)
+        found.update(fetched)
+
+    return found
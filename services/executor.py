@@ -0,0 +1,139 @@
+"""
+Worker pool for CPU-bound work (torrent decoding, hashing, ranking)
+and an event loop lag monitor to see how long the loop gets blocked.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    def __init__(self):
+        self.kind = settings.worker_pool_type.lower()
+        self.max_workers = settings.worker_pool_size or min(4, os.cpu_count() or 1)
+        self.batch_size = max(1, settings.worker_batch_size)
+        # Bounds the number of tasks queued on the executor at any time
+        self._slots = asyncio.Semaphore(max(1, settings.worker_queue_size))
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # Never fork: the server already runs threads (DNS executor, cpu workers)
+                # and a forked child can inherit a lock one of them held
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(method)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="cpu-worker"
+                )
+            logger.info(f"Started {self.kind} worker pool with {self.max_workers} workers")
+        return self._executor
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run fn(*args) on the pool.
+        fn must be a module-level function so the process pool can pickle it.
+        Payloads are passed as-is: threads share the same objects, processes
+        pickle them once per task.
+        """
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+
+    async def map_batched(
+        self, batch_fn: Callable[[List[Any]], List[Any]], items: Sequence[Any]
+    ) -> List[Any]:
+        """
+        Apply batch_fn over items in chunks of batch_size, one pool task per chunk.
+        batch_fn takes a list and returns a list of the same length.
+        Results are returned in input order; items of a batch whose task
+        failed come back as None so one broken batch can't fail the rest.
+        """
+        if not items:
+            return []
+        batches = [
+            list(items[i:i + self.batch_size])
+            for i in range(0, len(items), self.batch_size)
+        ]
+        results = await asyncio.gather(
+            *[self.run(batch_fn, batch) for batch in batches], return_exceptions=True
+        )
+        values = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Worker batch of {len(batch)} items failed: {result}")
+                values.extend([None] * len(batch))
+            else:
+                values.extend(result)
+        return values
+
+
+class LoopLagMonitor:
+    """
+    Periodically sleeps for a fixed interval and records how late it wakes up.
+    The overshoot is the time the event loop was blocked by synchronous work.
+    """
+
+    def __init__(self):
+        self.interval = settings.loop_monitor_interval
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.samples += 1
+            self.total_lag += lag
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag > settings.loop_lag_warn_threshold:
+                logger.warning(f"Event loop was blocked for {lag * 1000:.1f}ms")
+
+    def stats(self) -> Dict[str, Any]:
+        """Loop lag stats in milliseconds"""
+        return {
+            "samples": self.samples,
+            "last_ms": round(self.last_lag * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+            "avg_ms": round(self.total_lag / self.samples * 1000, 2) if self.samples else 0.0,
+        }
+
+
+# Singletons
+worker_pool = WorkerPool()
+loop_monitor = LoopLagMonitor()
@@ -1,8 +1,11 @@
 import httpx
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from urllib.parse import quote
 from settings import settings
+from services.executor import worker_pool
+from services.upstream import upstream_event_hooks
+from services.torrent import info_hashes_from_torrents, rank_results
 
 logger = logging.getLogger(__name__)
 
@@ -10,15 +13,15 @@ class JackettService:
     def __init__(self):
         self.base_url = settings.jackett_url
         self.api_key = settings.jackett_api_key
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self.client = httpx.AsyncClient(timeout=30.0, event_hooks=upstream_event_hooks())
 
     async def close(self):
         await self.client.aclose()
 
-    async def _resolve_link(self, link: str) -> Optional[str]:
+    async def _resolve_link(self, link: str) -> Optional[Union[str, bytes]]:
         """
-        Resolve a Jackett download link to a magnet URI or InfoHash.
-        Downloads the .torrent file and extracts the info hash.
+        Resolve a Jackett download link to a magnet URI or raw .torrent payload.
+        Decoding the .torrent is CPU-bound and is left to the worker pool.
         """
         if not link:
             return None
@@ -55,23 +58,12 @@ class JackettService:
             
             # If we got here, it might be a direct .torrent file (status 200)
             if resp.status_code == 200:
-                # Parse .torrent file
-                import hashlib
-                import bencode
-                
-                torrent_data = bencode.bdecode(resp.content)
-                info = torrent_data.get(b'info')
-                if info:
-                    info_hash = hashlib.sha1(bencode.bencode(info)).hexdigest()
-                    return info_hash
+                # Hand the body over as-is, no copy
+                return resp.content
                     
         except Exception as e:
             logger.warning(f"Failed to resolve link {link}: {e}")
             return None
-                
-        except Exception as e:
-            logger.warning(f"Failed to resolve link {link}: {e}")
-            return None
 
     async def search(self, type: str, id: str) -> List[Dict[str, Any]]:
         """
@@ -105,32 +97,38 @@ class JackettService:
             results = data.get("Results", [])
             logger.info(f"Jackett returned {len(results)} results")
             
-            parsed_results = self._parse_results(results)
+            # Ranking is microseconds, only .torrent decoding is worth the pool
+            parsed_results = rank_results(self._parse_results(results))
             
             # Resolve links for items missing info_hash/magnet (e.g. ArenaBG)
-            # We do this in parallel to be fast
+            # Downloads run in parallel, .torrent decoding goes to the worker pool in batches
             import asyncio
             
-            async def resolve_item(item):
-                if not item.get("info_hash") and not item.get("magnet") and item.get("link"):
-                    resolved = await self._resolve_link(item["link"])
-                    if resolved:
-                        if len(resolved) == 40: # InfoHash
-                            item["info_hash"] = resolved
-                            item["magnet"] = f"magnet:?xt=urn:btih:{resolved}"
-                        elif resolved.startswith("magnet:"):
-                            item["magnet"] = resolved
-                            # Extract hash
-                            import re
-                            match = re.search(r'xt=urn:btih:([a-zA-Z0-9]+)', resolved)
-                            if match:
-                                item["info_hash"] = match.group(1)
-            
-            # Filter items that need resolution
-            to_resolve = [item for item in parsed_results if not item.get("info_hash") and item.get("link")]
+            to_resolve = [item for item in parsed_results if not item.get("info_hash") and not item.get("magnet") and item.get("link")]
             if to_resolve:
                 logger.info(f"Resolving {len(to_resolve)} torrent links...")
-                await asyncio.gather(*[resolve_item(item) for item in to_resolve])
+                resolved = await asyncio.gather(*[self._resolve_link(item["link"]) for item in to_resolve])
+                
+                torrent_items = []
+                payloads = []
+                for item, value in zip(to_resolve, resolved):
+                    if isinstance(value, bytes):
+                        torrent_items.append(item)
+                        payloads.append(value)
+                    elif isinstance(value, str) and value.startswith("magnet:"):
+                        item["magnet"] = value
+                        # Extract hash
+                        import re
+                        match = re.search(r'xt=urn:btih:([a-zA-Z0-9]+)', value)
+                        if match:
+                            item["info_hash"] = match.group(1)
+                
+                if payloads:
+                    hashes = await worker_pool.map_batched(info_hashes_from_torrents, payloads)
+                    for item, info_hash in zip(torrent_items, hashes):
+                        if info_hash:
+                            item["info_hash"] = info_hash
+                            item["magnet"] = f"magnet:?xt=urn:btih:{info_hash}"
             
             return parsed_results
             
@@ -168,21 +166,6 @@ class JackettService:
                 logger.warning(f"Failed to parse result: {e}")
                 continue
                 
-        # Sort by quality score then seeders
-        def get_quality_score(item):
-            title = item["title"].lower()
-            score = 0
-            if "2160p" in title or "4k" in title: score += 400
-            elif "1080p" in title: score += 300
-            elif "720p" in title: score += 200
-            elif "480p" in title: score += 100
-            
-            if "bluray" in title or "remux" in title: score += 50
-            if "web-dl" in title or "webdl" in title: score += 30
-            
-            return score + item["seeders"] # Add seeders as tie-breaker/minor factor
-
-        parsed.sort(key=get_quality_score, reverse=True)
         return parsed
 
 # Singleton instance
@@ -1,13 +1,14 @@
 import httpx
 import logging
 from typing import Optional, Tuple
+from services.upstream import upstream_event_hooks
 
 logger = logging.getLogger(__name__)
 
 class MetadataService:
     def __init__(self):
         self.base_url = "https://v3-cinemeta.strem.io"
-        self.client = httpx.AsyncClient(timeout=10.0)
+        self.client = httpx.AsyncClient(timeout=10.0, event_hooks=upstream_event_hooks())
 
     async def close(self):
         await self.client.aclose()
@@ -0,0 +1,189 @@
+"""
+Background prefetcher that keeps popular titles warm.
+
+Requests are counted per (type, id) with an exponentially decaying score.
+Every prefetch_interval the top-N titles (plus an optional local seed list)
+get their search results and debrid flags refreshed before they expire,
+within a budget of prefetch_budget upstream HTTP calls per run.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from settings import settings
+from services.search import search, search_cache, check_debrid, extract_hashes
+from services.tenants import tenant_registry
+from services.upstream import count_upstream_calls
+
+logger = logging.getLogger(__name__)
+
+# Content types the prefetcher tracks
+PREFETCH_TYPES = ("movie", "series")
+
+# Score given to seed titles, one request's worth so real traffic ranks above
+SEED_WEIGHT = 1.0
+
+
+class PopularityTracker:
+    """Decaying request counter per (type, id)"""
+
+    def __init__(self):
+        self.half_life = settings.prefetch_half_life
+        self.max_size = settings.prefetch_tracked_size
+        # (type, id) -> (score, last update)
+        self._scores: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._seeds: Dict[Tuple[str, str], float] = {}
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        if self.half_life <= 0:
+            return score
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def record(self, type: str, id: str):
+        """Count a request, ignoring anything that isn't a movie/series IMDb id"""
+        if type not in PREFETCH_TYPES or not id.startswith("tt"):
+            return
+        now = time.monotonic()
+        key = (type, id)
+        score, updated = self._scores.get(key, (0.0, now))
+        self._scores[key] = (self._decayed(score, updated, now) + 1.0, now)
+        if len(self._scores) > self.max_size:
+            self._prune(now)
+
+    def _prune(self, now: float):
+        """Drop the coldest half of tracked titles"""
+        ranked = sorted(
+            self._scores.items(),
+            key=lambda kv: self._decayed(kv[1][0], kv[1][1], now),
+            reverse=True
+        )
+        self._scores = dict(ranked[:self.max_size // 2])
+
+    def score(self, type: str, id: str) -> float:
+        key = (type, id)
+        score = self._seeds.get(key, 0.0)
+        if key in self._scores:
+            score += self._decayed(*self._scores[key], time.monotonic())
+        return score
+
+    def top(self, n: int) -> List[Tuple[str, str]]:
+        """The n hottest titles, seeds included"""
+        keys = set(self._scores) | set(self._seeds)
+        return sorted(keys, key=lambda k: self.score(*k), reverse=True)[:n]
+
+    def load_seeds(self, path: str) -> int:
+        """
+        Load seed titles from a local file, one "<type> <imdb_id>" per line.
+        Type defaults to movie; blank lines and # comments are ignored.
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            logger.warning(f"Failed to read prefetch seed file {path}: {e}")
+            return 0
+
+        for line in lines:
+            parts = line.split("#", 1)[0].split()
+            if not parts:
+                continue
+            type, id = ("movie", parts[0]) if len(parts) == 1 else (parts[0], parts[1])
+            if type not in PREFETCH_TYPES or not id.startswith("tt"):
+                logger.warning(f"Skipping invalid prefetch seed: {line!r}")
+                continue
+            self._seeds[(type, id)] = SEED_WEIGHT
+        return len(self._seeds)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+class Prefetcher:
+    """Periodically refreshes search results and debrid flags for hot titles"""
+
+    def __init__(self, tracker: PopularityTracker):
+        self.tracker = tracker
+        self.interval = settings.prefetch_interval
+        self.top_n = settings.prefetch_top_n
+        self.budget = settings.prefetch_budget
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is not None or not settings.prefetch_enabled or self.interval <= 0:
+            return
+        if settings.prefetch_seed_file:
+            count = self.tracker.load_seeds(settings.prefetch_seed_file)
+            logger.info(f"Loaded {count} prefetch seeds")
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                spent = await self.run_once()
+                if spent:
+                    logger.info(f"Prefetch made {spent} upstream calls")
+            except Exception as e:
+                logger.error(f"Prefetch run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _stale_hashes(self, hashes: List[str], horizon: float) -> List[str]:
+        """Hashes whose debrid flags are missing or expire within horizon"""
+        tenant = tenant_registry.default
+        services = []
+        if tenant.realdebrid_api_key:
+            services.append(tenant.rd)
+        if tenant.torbox_api_key:
+            services.append(tenant.torbox)
+
+        stale = []
+        for h in hashes:
+            for service in services:
+                remaining = service.cache.expires_in(h)
+                if remaining is None or remaining <= horizon:
+                    stale.append(h)
+                    break
+        return stale
+
+    async def run_once(self) -> int:
+        """
+        Refresh hot titles that would expire before the next run.
+        Stops starting new titles once prefetch_budget upstream HTTP calls
+        are spent, so a run can exceed it by at most one title's calls.
+        Returns the number of upstream calls made.
+        """
+        # Anything expiring before the next run (plus slack) counts as stale
+        horizon = self.interval * 1.5
+        spent = 0
+        for type, id in self.tracker.top(self.top_n):
+            if spent >= self.budget:
+                break
+
+            with count_upstream_calls() as calls:
+                remaining = search_cache.expires_in((type, id))
+                if remaining is None or remaining <= horizon:
+                    results = await search(type, id, refresh=True)
+                else:
+                    # Search results are fresh, debrid flags expire sooner
+                    results = search_cache.get((type, id), [])
+
+                # Debrid flags are refreshed for the instance-wide keys only
+                hashes = self._stale_hashes(extract_hashes(results), horizon)
+                if hashes:
+                    await check_debrid(tenant_registry.default, hashes, refresh=True)
+            spent += calls.calls
+        return spent
+
+
+# Singletons
+popularity = PopularityTracker()
+prefetcher = Prefetcher(popularity)
@@ -0,0 +1,94 @@
+"""
+Shared search pipeline: Cinemeta lookup + Jackett search + debrid checks.
+Used by the stream endpoint and the background prefetcher.
+"""
+import asyncio
+import logging
+import re
+from typing import List, Dict, Any, Tuple
+
+from settings import settings
+from services.cache import TTLCache
+from services.jackett import jackett_service
+from services.metadata import metadata_service
+from services.tenants import TenantContext
+
+logger = logging.getLogger(__name__)
+
+# (type, id) -> parsed results, shared across tenants
+search_cache = TTLCache(settings.search_cache_ttl, settings.search_cache_size)
+
+
+async def search(type: str, id: str, refresh: bool = False) -> List[Dict[str, Any]]:
+    """
+    Return Jackett results for a Stremio id, with info hashes filled in.
+    Served from search_cache unless refresh is set.
+    """
+    key = (type, id)
+    if not refresh:
+        cached = search_cache.get(key)
+        if cached is not None:
+            return cached
+
+    search_query = id
+    
+    # Resolve IMDb ID to Title if possible
+    if id.startswith("tt"):
+        title, year = await metadata_service.get_details(type, id)
+        if title:
+            # Construct text query: "Title Year"
+            # This is much better for trackers like ArenaBG/Zelka
+            search_query = f"{title} {year}" if year else title
+            logger.info(f"Resolved {id} to query: '{search_query}'")
+    
+    # Search Jackett
+    results = await jackett_service.search(type, search_query)
+    
+    for res in results:
+        if not res.get("info_hash") and res.get("magnet"):
+            match = re.search(r'xt=urn:btih:([a-zA-Z0-9]+)', res["magnet"])
+            if match:
+                res["info_hash"] = match.group(1) # Store for later
+
+    # Don't pin empty results, they are usually a transient upstream failure
+    if results:
+        search_cache.set(key, results)
+    return results
+
+
+def extract_hashes(results: List[Dict[str, Any]]) -> List[str]:
+    """Info hashes for Debrid checks"""
+    return [res["info_hash"] for res in results if res.get("info_hash")]
+
+
+async def check_debrid(
+    tenant: TenantContext, hashes: List[str], refresh: bool = False
+) -> Tuple[Dict[str, bool], Dict[str, bool]]:
+    """
+    Check RealDebrid and TorBox availability in parallel.
+    Returns (rd_cache, torbox_cache).
+    """
+    rd_cache = {}
+    torbox_cache = {}
+    
+    tasks = []
+    if tenant.realdebrid_api_key and hashes:
+        tasks.append(tenant.rd.check_availability(hashes, refresh=refresh))
+    else:
+        tasks.append(asyncio.sleep(0)) # Dummy task
+        
+    if tenant.torbox_api_key and hashes:
+        tasks.append(tenant.torbox.check_availability(hashes, refresh=refresh))
+    else:
+        tasks.append(asyncio.sleep(0)) # Dummy task
+        
+    # Execute checks
+    check_results = await asyncio.gather(*tasks)
+    
+    if tenant.realdebrid_api_key and hashes:
+        rd_cache = check_results[0] if isinstance(check_results[0], dict) else {}
+        
+    if tenant.torbox_api_key and hashes:
+        torbox_cache = check_results[1] if isinstance(check_results[1], dict) else {}
+
+    return rd_cache, torbox_cache
@@ -0,0 +1,199 @@
+"""
+Per-user (tenant) configuration for the addon.
+
+A tenant's debrid keys are encrypted with settings.secret_key and embedded
+in the addon URL (/{config}/manifest.json). Decoded tenants are kept in a
+bounded LRU; each owns its debrid clients, connection pools and rate limits.
+Search and metadata services stay shared across all tenants.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Set
+
+import httpx
+from cryptography.fernet import Fernet, InvalidToken
+
+from settings import settings, PLACEHOLDER_SECRET_KEY
+from services.ratelimit import RateLimiter
+from services.realdebrid import RealDebridService, rd_service
+from services.torbox import TorBoxService, torbox_service
+
+logger = logging.getLogger(__name__)
+
+# Keys stored in the encrypted config payload
+CONFIG_FIELDS = ("realdebrid_api_key", "torbox_api_key")
+
+# One SSL context for all tenant clients, loading CA certs per client is slow
+_ssl_context = httpx.create_ssl_context()
+
+
+def secret_key_configured() -> bool:
+    """Tokens are only private if the operator replaced the placeholder secret"""
+    return bool(settings.secret_key) and settings.secret_key != PLACEHOLDER_SECRET_KEY
+
+
+def _fernet() -> Fernet:
+    # Fernet needs a 32-byte urlsafe base64 key, derive it from the secret
+    digest = hashlib.sha256(settings.secret_key.encode("utf-8")).digest()
+    return Fernet(base64.urlsafe_b64encode(digest))
+
+
+def encode_config(config: Dict[str, Any]) -> str:
+    """
+    Encrypt a tenant config into a URL-safe token.
+    Raises RuntimeError if secret_key is still the placeholder.
+    """
+    if not secret_key_configured():
+        raise RuntimeError("SECRET_KEY is not configured")
+    payload = {k: config.get(k) for k in CONFIG_FIELDS if config.get(k)}
+    return _fernet().encrypt(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def decode_config(token: str) -> Optional[Dict[str, Any]]:
+    """Decrypt a config token. Returns None if it is invalid or was tampered with."""
+    try:
+        data = json.loads(_fernet().decrypt(token.encode("ascii")))
+    except (InvalidToken, ValueError, UnicodeError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    return {k: data.get(k) for k in CONFIG_FIELDS}
+
+
+def config_key(config: Dict[str, Any]) -> str:
+    """Stable identity of a decoded config (tokens for the same keys differ)"""
+    canonical = json.dumps({k: config.get(k) for k in CONFIG_FIELDS}, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _tenant_service_options() -> Dict[str, Any]:
+    """Constructor options shared by every tenant's debrid services"""
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.tenant_max_connections,
+            max_keepalive_connections=settings.tenant_max_keepalive
+        ),
+        "rate_limiter": RateLimiter(settings.tenant_rate_limit, settings.tenant_rate_burst),
+        "cache_size": settings.tenant_availability_cache_size,
+        "verify": _ssl_context
+    }
+
+
+class TenantContext:
+    """Debrid state for one user: keys, clients and rate limits"""
+
+    def __init__(
+        self,
+        realdebrid_api_key: Optional[str] = None,
+        torbox_api_key: Optional[str] = None,
+        rd: Optional[RealDebridService] = None,
+        torbox: Optional[TorBoxService] = None
+    ):
+        self.realdebrid_api_key = realdebrid_api_key
+        self.torbox_api_key = torbox_api_key
+
+        # Services only exist for keys that are set, their HTTP clients are created lazily
+        self.rd = rd
+        if self.rd is None and realdebrid_api_key:
+            self.rd = RealDebridService(api_key=realdebrid_api_key, **_tenant_service_options())
+        self.torbox = torbox
+        if self.torbox is None and torbox_api_key:
+            self.torbox = TorBoxService(api_key=torbox_api_key, **_tenant_service_options())
+
+    async def close(self):
+        if self.rd is not None:
+            await self.rd.close()
+        if self.torbox is not None:
+            await self.torbox.close()
+
+
+class TenantRegistry:
+    """
+    Bounded LRU of tenant contexts keyed by config_key, so every token
+    issued for the same debrid keys shares one context.
+    Tokens seen before map straight to their key without decrypting.
+    """
+
+    def __init__(self):
+        self.max_size = settings.tenant_cache_size
+        self._contexts: "OrderedDict[str, TenantContext]" = OrderedDict()
+        # token -> config_key, bounded like the contexts
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+        # Pending closes of evicted contexts, referenced so they aren't garbage-collected
+        self._closing: Set[asyncio.Task] = set()
+        # Instance-wide keys from settings, used when no config is in the URL
+        self.default = TenantContext(
+            realdebrid_api_key=settings.realdebrid_api_key,
+            torbox_api_key=settings.torbox_api_key,
+            rd=rd_service,
+            torbox=torbox_service
+        )
+
+    def get(self, token: Optional[str]) -> Optional[TenantContext]:
+        """
+        Return the context for a config token, decoding it on first use.
+        Returns None if the token is invalid.
+        """
+        if not token:
+            return self.default
+
+        key = self._aliases.get(token)
+        if key is not None and key in self._contexts:
+            self._aliases.move_to_end(token)
+            self._contexts.move_to_end(key)
+            return self._contexts[key]
+
+        config = decode_config(token)
+        if config is None:
+            return None
+
+        key = config_key(config)
+        self._aliases[token] = key
+        self._aliases.move_to_end(token)
+        while len(self._aliases) > self.max_size:
+            self._aliases.popitem(last=False)
+
+        ctx = self._contexts.get(key)
+        if ctx is not None:
+            self._contexts.move_to_end(key)
+            return ctx
+
+        ctx = TenantContext(**config)
+        self._contexts[key] = ctx
+        while len(self._contexts) > self.max_size:
+            _, evicted = self._contexts.popitem(last=False)
+            task = asyncio.get_running_loop().create_task(self._close_later(evicted))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        return ctx
+
+    async def _close_later(self, ctx: TenantContext):
+        """
+        Close an evicted context after tenant_close_delay, so requests that
+        already hold it can finish with open clients.
+        """
+        try:
+            await asyncio.sleep(settings.tenant_close_delay)
+        finally:
+            await ctx.close()
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    async def close(self):
+        # Cancelling skips the delay, _close_later still closes its context
+        for task in list(self._closing):
+            task.cancel()
+        await asyncio.gather(*self._closing, return_exceptions=True)
+        while self._contexts:
+            _, ctx = self._contexts.popitem()
+            await ctx.close()
+        await self.default.close()
+
+
+# Singleton
+tenant_registry = TenantRegistry()
@@ -1,27 +1,68 @@
 import httpx
 import logging
-from typing import Optional, Dict, Any, List
+import ssl
+from typing import Optional, Dict, Any, List, Union
 from settings import settings
+from services.ratelimit import RateLimiter
+from services.cache import TTLCache, cached_lookup
+from services.upstream import upstream_event_hooks
 
 logger = logging.getLogger(__name__)
 
 class TorBoxService:
-    def __init__(self):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        limits: Optional[httpx.Limits] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache_size: Optional[int] = None,
+        verify: Union[bool, ssl.SSLContext] = True
+    ):
         self.base_url = "https://api.torbox.app/v1/api"
-        self.api_key = settings.torbox_api_key
-        self.client = httpx.AsyncClient(timeout=10.0)
+        self.api_key = api_key if api_key is not None else settings.torbox_api_key
+        # Keep httpx's default pool caps (100 / 20 keep-alive) unless given explicit limits
+        self.limits = limits or httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        self.verify = verify
+        self._client: Optional[httpx.AsyncClient] = None
+        self.rate_limiter = rate_limiter
+        # hash -> is_cached, so repeat lookups for popular titles skip the API
+        self.cache = TTLCache(
+            settings.availability_cache_ttl,
+            cache_size or settings.availability_cache_size
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use, building a client loads an SSL context unless one is shared
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=self.limits,
+                verify=self.verify,
+                event_hooks=upstream_event_hooks()
+            )
+        return self._client
 
     async def close(self):
-        await self.client.aclose()
+        if self._client is not None:
+            await self._client.aclose()
 
-    async def check_availability(self, hashes: List[str]) -> Dict[str, bool]:
+    async def check_availability(self, hashes: List[str], refresh: bool = False) -> Dict[str, bool]:
         """
         Check instant availability of torrent hashes on TorBox.
         Returns a dict mapping hash -> is_cached (bool)
+        Known hashes are served from the local cache unless refresh is set.
         """
         if not self.api_key or not hashes:
             return {}
 
+        return await cached_lookup(self.cache, hashes, self._fetch_availability, refresh)
+
+    async def _fetch_availability(self, hashes: List[str]) -> Dict[str, bool]:
+        """Query the API for the given hashes, {} on failure"""
+        if not self.api_key or not hashes:
+            return {}
+
         # TorBox allows checking multiple hashes: ?hash=h1,h2,h3&format=object
         # Limit is not strictly documented but let's be safe with chunks if needed.
         
@@ -36,6 +77,8 @@ class TorBoxService:
                 "list_files": "false"
             }
             headers = {"Authorization": f"Bearer {self.api_key}"}
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
             
             response = await self.client.get(url, params=params, headers=headers)
             response.raise_for_status()
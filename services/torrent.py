@@ -0,0 +1,59 @@
+"""
+Pure, CPU-bound helpers for torrent payloads and result ranking.
+
+Everything here is a plain module-level function so it can be shipped to a
+thread or process pool (see services/executor.py) without dragging any
+service state or HTTP clients along. Ranking is cheap and runs inline.
+"""
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional
+
+import bencode
+
+logger = logging.getLogger(__name__)
+
+
+def info_hash_from_torrent(data: bytes) -> Optional[str]:
+    """
+    Decode a .torrent payload and return its hex info hash.
+    Returns None if the payload is not a valid torrent.
+    """
+    try:
+        torrent_data = bencode.bdecode(data)
+        if not isinstance(torrent_data, dict):
+            return None
+
+        # bencode.py decodes keys to str, older versions kept bytes
+        info = torrent_data.get("info") or torrent_data.get(b"info")
+        if not info:
+            return None
+        return hashlib.sha1(bencode.bencode(info)).hexdigest()
+    except Exception as e:
+        logger.warning(f"Failed to decode torrent payload: {e}")
+        return None
+
+
+def info_hashes_from_torrents(payloads: List[bytes]) -> List[Optional[str]]:
+    """Batch variant of info_hash_from_torrent (one pool task per batch)"""
+    return [info_hash_from_torrent(data) for data in payloads]
+
+
+def quality_score(item: Dict[str, Any]) -> int:
+    """Score a parsed result by resolution and source, seeders as tie-breaker"""
+    title = item["title"].lower()
+    score = 0
+    if "2160p" in title or "4k" in title: score += 400
+    elif "1080p" in title: score += 300
+    elif "720p" in title: score += 200
+    elif "480p" in title: score += 100
+
+    if "bluray" in title or "remux" in title: score += 50
+    if "web-dl" in title or "webdl" in title: score += 30
+
+    return score + item["seeders"] # Add seeders as tie-breaker/minor factor
+
+
+def rank_results(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return results sorted by quality score, best first"""
+    return sorted(items, key=quality_score, reverse=True)
@@ -0,0 +1,41 @@
+"""
+Counting of outbound HTTP calls, used to keep background work within a budget.
+
+Every service client registers upstream_event_hooks(). Calls are only
+counted inside a count_upstream_calls() block, including tasks spawned
+from it, so regular user requests are unaffected.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+
+class UpstreamCounter:
+    def __init__(self):
+        self.calls = 0
+
+
+_counter: ContextVar[Optional[UpstreamCounter]] = ContextVar("upstream_counter", default=None)
+
+
+async def _count_request(request: httpx.Request):
+    counter = _counter.get()
+    if counter is not None:
+        counter.calls += 1
+
+
+def upstream_event_hooks() -> Dict[str, List[Any]]:
+    """httpx event hooks that count each request (redirect hops included)"""
+    return {"request": [_count_request]}
+
+
+@contextmanager
+def count_upstream_calls() -> Iterator[UpstreamCounter]:
+    counter = UpstreamCounter()
+    token = _counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _counter.reset(token)
@@ -2,6 +2,10 @@ from pydantic_settings import BaseSettings
 from typing import Optional
 
 
+# Default from .env.example, not a secret
+PLACEHOLDER_SECRET_KEY = "change_this_to_a_random_secret_key"
+
+
 class Settings(BaseSettings):
     """Application settings"""
     
@@ -19,11 +23,45 @@ class Settings(BaseSettings):
     alldebrid_api_key: Optional[str] = None
     torbox_api_key: Optional[str] = None
     
+    # Per-user configuration (debrid keys encrypted into the addon URL)
+    tenant_cache_size: int = 1000
+    tenant_max_connections: int = 4
+    tenant_max_keepalive: int = 2
+    tenant_rate_limit: float = 5.0
+    tenant_rate_burst: int = 10
+    tenant_availability_cache_size: int = 500
+    tenant_close_delay: float = 60.0
+    
+    # Caching (seconds)
+    search_cache_ttl: int = 1800
+    search_cache_size: int = 1000
+    availability_cache_ttl: int = 900
+    availability_cache_size: int = 20000
+    
+    # Background prefetching of popular titles
+    prefetch_enabled: bool = True
+    prefetch_interval: int = 300
+    prefetch_top_n: int = 50
+    prefetch_budget: int = 200  # upstream HTTP calls per run
+    prefetch_half_life: int = 3600
+    prefetch_tracked_size: int = 10000
+    prefetch_seed_file: Optional[str] = None
+    
     # Redis
     redis_url: Optional[str] = None
     
+    # CPU worker pool ("thread" or "process")
+    worker_pool_type: str = "thread"
+    worker_pool_size: Optional[int] = None
+    worker_batch_size: int = 16
+    worker_queue_size: int = 64
+    
+    # Event loop lag monitoring (seconds, 0 disables)
+    loop_monitor_interval: float = 1.0
+    loop_lag_warn_threshold: float = 0.1
+    
     # Security
-    secret_key: str = "change_this_to_a_random_secret_key"
+    secret_key: str = PLACEHOLDER_SECRET_KEY
     
     # Logging
     log_level: str = "INFO"